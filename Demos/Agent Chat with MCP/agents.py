@@ -1,9 +1,28 @@
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
+from agno.session import SessionSummaryManager
+import os, sys, logging
+
+log = logging.getLogger(__name__)
+
+# ANSI color codes for tool call logging. They're left out when the log
+# (stderr) isn't a terminal so pipes and log files don't get control codes.
+_COLOR = sys.stderr.isatty()
+_YELLOW = '\x1b[33m' if _COLOR else ''
+_RESET = '\x1b[0m' if _COLOR else ''
+
+HISTORY_RUNS = int(os.getenv('HISTORY_RUNS', '4')) # Recent runs sent with each prompt
+
+# Set SESSION_SUMMARIES to True to also summarize each session after every
+# run. Summaries cost an extra LLM call per run (made with SUMMARY_MODEL)
+# that the response stream waits for, so they're off by default.
+SESSION_SUMMARIES = os.getenv('SESSION_SUMMARIES', 'False').lower() == 'true'
+SUMMARY_MODEL = 'gpt-4o-mini'
 
 # Function to hook into function calls
 async def function_hook(function_name, function_call, arguments):
-    print(f'\x1b[33mCalling {function_name}\x1b[0m')
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('%sCalling %s%s', _YELLOW, function_name, _RESET)
     return await function_call(**arguments)
 
 # Function to create an agent
@@ -19,7 +38,9 @@ def create_agent(session_id, memory, mcp_tools):
         tools=[mcp_tools],
         tool_hooks=[function_hook], # Shows function calls performed by the agent
         add_history_to_context=True,
-        num_history_runs=10,
+        num_history_runs=HISTORY_RUNS,
+        enable_session_summaries=SESSION_SUMMARIES,
+        session_summary_manager=SessionSummaryManager(model=OpenAIChat(id=SUMMARY_MODEL)) if SESSION_SUMMARIES else None,
         session_id=session_id,
         db=memory,
         markdown=True
@@ -5,11 +5,41 @@ from quart import Quart, render_template, request, Response
 from agno.db.in_memory import InMemoryDb
 from agno.tools.mcp import MCPTools
 from agents import create_agent
-import uuid
+import uuid, os, sys, logging
+from collections import OrderedDict
+
+# coalesce is shared by the demos and lives in the parent directory. It's
+# searched first so an installed package can't shadow it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo_streaming import coalesce
+
+# Show the tool calls made by the agents in the console. Set LOG_LEVEL
+# to INFO or higher to hide them.
+logging.basicConfig(format='%(message)s')
+logging.getLogger('agents').setLevel(os.getenv('LOG_LEVEL', 'DEBUG'))
 
 app = Quart(__name__)
 _memory = InMemoryDb() # Shared memory for agents
 _mcp_tools = None # MCPTool instance
+_agents = OrderedDict() # Agents by session ID, least recently used first
+MAX_CACHED_AGENTS = 256
+
+# Helper function to get the agent for a session, creating it if necessary.
+# Agents are cached so returning users reuse the same agent.
+def get_agent(session_id):
+    agent = _agents.get(session_id)
+
+    if agent is None:
+        # Create an agent and connect it to a session and the MCP server
+        agent = create_agent(session_id, _memory, _mcp_tools)
+        _agents[session_id] = agent
+
+        if len(_agents) > MAX_CACHED_AGENTS:
+            _agents.popitem(last=False) # Evict the least recently used agent
+    else:
+        _agents.move_to_end(session_id)
+
+    return agent
 
 # Home page
 @app.route('/', methods=['GET'])
@@ -23,8 +53,8 @@ async def streaming_chat():
         # Get the session ID or create a new one
         session_id = request.headers.get('X-Session-ID') or str(uuid.uuid4())
 
-        # Create an agent and connect it to a session and GitHub's MCP server
-        agent = create_agent(session_id, _memory, _mcp_tools)
+        # Get the agent for this session, creating it if necessary
+        agent = get_agent(session_id)
 
         # Get the user input and generate a response
         user_input = request.args.get('input')
@@ -35,7 +65,7 @@ async def streaming_chat():
                 if chunk.event == 'RunContent':
                     yield chunk.content
 
-        response = Response(generate(), mimetype='text/plain; charset=utf-8')
+        response = Response(coalesce(generate()), mimetype='text/plain; charset=utf-8')
         response.headers['X-Session-ID'] = session_id
         return response
 
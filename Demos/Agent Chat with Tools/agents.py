@@ -2,13 +2,65 @@ from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 from agno.tools.calculator import CalculatorTools
 from agno.tools.file_generation import FileGenerationTools
+from agno.tools.toolkit import Toolkit
 from agno.models.message import Message
-import sqlite3, json, re, os
+from agno.session import SessionSummaryManager
+import aiosqlite, asyncio, orjson, os, math, operator, functools, sys, logging
+from collections import OrderedDict
+from openai import AsyncOpenAI
+
+log = logging.getLogger(__name__)
+
+# ANSI color codes for tool call logging. They're left out when the log
+# (stderr) isn't a terminal so pipes and log files don't get control codes.
+_COLOR = sys.stderr.isatty()
+_GREEN = '\x1b[32m' if _COLOR else ''
+_YELLOW = '\x1b[33m' if _COLOR else ''
+_RESET = '\x1b[0m' if _COLOR else ''
 
 MODEL = 'gpt-4o-mini'
+HISTORY_RUNS = int(os.getenv('HISTORY_RUNS', '4')) # Recent runs sent with each prompt
+
+# Set SESSION_SUMMARIES to True to also summarize each session after every
+# run. Summaries cost an extra LLM call per run (made with SUMMARY_MODEL)
+# that the response stream waits for, so they're off by default.
+SESSION_SUMMARIES = os.getenv('SESSION_SUMMARIES', 'False').lower() == 'true'
+SUMMARY_MODEL = 'gpt-4o-mini'
+
+# Caching of generated SQL. Set SEMANTIC_CACHE to True to also reuse SQL
+# for questions that are similar, but not identical, to earlier ones.
+SQL_CACHE_SIZE = 512
+SEMANTIC_CACHE = False
+EMBEDDING_MODEL = 'text-embedding-3-small'
+SIMILARITY_THRESHOLD = 0.95
+_sql_cache = OrderedDict() # Generated SQL by question, least recently used first
+_semantic_cache = [] # (embedding, sql) pairs for the semantic cache
+
+# Model used by text2sql, created once and shared by all calls
+_SQL_MODEL = OpenAIChat(id=MODEL, temperature=0.2)
+
+# Connection to the database, opened once at startup by open_database()
+# and shared by all queries
+DB_PATH = 'static/northwind.db'
+_db = None
+
+# Helper function to open the database connection
+async def open_database():
+    global _db
+    _db = await aiosqlite.connect(DB_PATH, isolation_level=None)
+    await _db.executescript('''
+        PRAGMA cache_size=-65536;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+        PRAGMA query_only=1;
+    ''')
+
+# Helper function to close the database connection
+async def close_database():
+    await _db.close()
 
 # Tool function for querying the database
-def query_database(text):
+async def query_database(text):
     '''
     Queries the Northwind database to answer a question or respond
     to a command. Northwind contains information about sales, products,
@@ -22,147 +74,235 @@ def query_database(text):
     '''
 
     # Convert a natural-language query into a SQL query
-    sql = text2sql(text)
-    print(f'\x1b[32m{sql}\x1b[0m')
-
-    # Execute the SQL query
-    connection = sqlite3.connect('static/northwind.db')
-    cursor = connection.cursor()
-    cursor.execute(sql)
-    rows = cursor.fetchall()
-
-    # Return the JSON-encoded results
-    return json.dumps(rows)
-
-# Helper function to convert natural-language queries into SQL queries
-def text2sql(text):
-    prompt = f'''
-        Generate a well-formed SQLite query from the prompt below. Return
-        the SQL only. Do not use markdown formatting, and do not use SELECT *.
-
-        PROMPT: {text}
-    
-        The database targeted by the query contains the following tables:
-
-        CREATE TABLE [Categories]
-        (
-            [CategoryID] INTEGER PRIMARY KEY AUTOINCREMENT,
-            [CategoryName] TEXT,
-            [Description] TEXT
-        )
-
-        CREATE TABLE [Customers]
-        (
-            [CustomerID] TEXT,
-            [CompanyName] TEXT,
-            [ContactName] TEXT,
-            [ContactTitle] TEXT,
-            [Address] TEXT,
-            [City] TEXT,
-            [Region] TEXT,
-            [PostalCode] TEXT,
-            [Country] TEXT,
-            [Phone] TEXT,
-            [Fax] TEXT,
-            PRIMARY KEY (`CustomerID`)
-        )
-
-        CREATE TABLE [Employees]
-        (
-            [EmployeeID] INTEGER PRIMARY KEY AUTOINCREMENT,
-            [LastName] TEXT,
-            [FirstName] TEXT,
-            [Title] TEXT,
-            [TitleOfCourtesy] TEXT,
-            [BirthDate] DATE,
-            [HireDate] DATE,
-            [Address] TEXT,
-            [City] TEXT,
-            [Region] TEXT,
-            [PostalCode] TEXT,
-            [Country] TEXT,
-            [HomePhone] TEXT,
-            [Extension] TEXT,
-            [Notes] TEXT,
-            [ReportsTo] INTEGER,
-            FOREIGN KEY ([ReportsTo]) REFERENCES [Employees] ([EmployeeID]) 
-        )
-
-        CREATE TABLE [Shippers]
-        (
-            [ShipperID] INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
-            [CompanyName] TEXT NOT NULL,
-            [Phone] TEXT
-        )
-
-        CREATE TABLE [Suppliers]
-        (
-            [SupplierID] INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
-            [CompanyName] TEXT NOT NULL,
-            [ContactName] TEXT,
-            [ContactTitle] TEXT,
-            [Address] TEXT,
-            [City] TEXT,
-            [Region] TEXT,
-            [PostalCode] TEXT,
-            [Country] TEXT,
-            [Phone] TEXT,
-            [Fax] TEXT,
-            [HomePage] TEXT
-        )
-
-        CREATE TABLE [Products]
-        (
-            [ProductID] INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
-            [ProductName] TEXT NOT NULL,
-            [SupplierID] INTEGER,
-            [CategoryID] INTEGER,
-            [QuantityPerUnit] TEXT,
-            [UnitPrice] NUMERIC DEFAULT 0,
-            [UnitsInStock] INTEGER DEFAULT 0,
-            [UnitsOnOrder] INTEGER DEFAULT 0,
-            [ReorderLevel] INTEGER DEFAULT 0,
-            [Discontinued] TEXT NOT NULL DEFAULT '0',
-            FOREIGN KEY ([CategoryID]) REFERENCES [Categories] ([CategoryID]),
-            FOREIGN KEY ([SupplierID]) REFERENCES [Suppliers] ([SupplierID])
-        )
-
-        CREATE TABLE [Orders]
-        (
-            [OrderID] INTEGER PRIMARY KEY AUTOINCREMENT,
-            [CustomerID] INTEGER,
-            [EmployeeID] INTEGER,
-            [OrderDate] DATETIME,
-            [ShipperID] INTEGER,
-            FOREIGN KEY (EmployeeID) REFERENCES Employees (EmployeeID),
-            FOREIGN KEY (CustomerID) REFERENCES Customers (CustomerID),
-            FOREIGN KEY (ShipperID) REFERENCES Shippers (ShipperID)
-        );
-
-        CREATE TABLE [Order Details]
-        (
-            [OrderID] INTEGER NOT NULL,
-            [ProductID] INTEGER NOT NULL,
-            [UnitPrice] NUMERIC NOT NULL DEFAULT 0,
-            [Quantity] INTEGER NOT NULL DEFAULT 1,
-            [Discount] REAL NOT NULL DEFAULT 0,
-            PRIMARY KEY ("OrderID", "ProductID"),
-            FOREIGN KEY ([OrderID]) REFERENCES [Orders] ([OrderID]),
-            FOREIGN KEY ([ProductID]) REFERENCES [Products] ([ProductID]) 
-        )
-        '''
-
-    model=OpenAIChat(id=MODEL, temperature=0.2)
-    messages = [Message(role='user', content=prompt)]
-    response = model.response(messages)
-    pattern = r'^```[\w]*\n|\n```$'
-    content = re.sub(pattern, '', response.content, flags=re.MULTILINE)
-    return content
+    sql = await text2sql(text)
+    log.debug('%s%s%s', _GREEN, sql, _RESET)
+
+    # Execute the SQL query and return the JSON-encoded results. Rows are
+    # encoded one at a time as they're read rather than fetched all at once.
+    async with _db.execute(sql) as cursor:
+        rows = [orjson.dumps(row).decode() async for row in cursor]
+        return '[' + ','.join(rows) + ']'
+
+# System prompt used to convert natural-language queries into SQL queries.
+# It holds everything except the user's question, which is sent in a
+# separate user message, so every request starts with the same text. That
+# lets OpenAI's prompt caching skip reprocessing it (cache hits are reported
+# as cache_read_tokens in the response metrics). Keep it free of anything
+# that varies from call to call.
+SQL_SYSTEM_PROMPT = '''
+    The database targeted by the query contains the following tables:
+
+    CREATE TABLE [Categories]
+    (
+        [CategoryID] INTEGER PRIMARY KEY AUTOINCREMENT,
+        [CategoryName] TEXT,
+        [Description] TEXT
+    )
+
+    CREATE TABLE [Customers]
+    (
+        [CustomerID] TEXT,
+        [CompanyName] TEXT,
+        [ContactName] TEXT,
+        [ContactTitle] TEXT,
+        [Address] TEXT,
+        [City] TEXT,
+        [Region] TEXT,
+        [PostalCode] TEXT,
+        [Country] TEXT,
+        [Phone] TEXT,
+        [Fax] TEXT,
+        PRIMARY KEY (`CustomerID`)
+    )
+
+    CREATE TABLE [Employees]
+    (
+        [EmployeeID] INTEGER PRIMARY KEY AUTOINCREMENT,
+        [LastName] TEXT,
+        [FirstName] TEXT,
+        [Title] TEXT,
+        [TitleOfCourtesy] TEXT,
+        [BirthDate] DATE,
+        [HireDate] DATE,
+        [Address] TEXT,
+        [City] TEXT,
+        [Region] TEXT,
+        [PostalCode] TEXT,
+        [Country] TEXT,
+        [HomePhone] TEXT,
+        [Extension] TEXT,
+        [Notes] TEXT,
+        [ReportsTo] INTEGER,
+        FOREIGN KEY ([ReportsTo]) REFERENCES [Employees] ([EmployeeID]) 
+    )
+
+    CREATE TABLE [Shippers]
+    (
+        [ShipperID] INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        [CompanyName] TEXT NOT NULL,
+        [Phone] TEXT
+    )
+
+    CREATE TABLE [Suppliers]
+    (
+        [SupplierID] INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        [CompanyName] TEXT NOT NULL,
+        [ContactName] TEXT,
+        [ContactTitle] TEXT,
+        [Address] TEXT,
+        [City] TEXT,
+        [Region] TEXT,
+        [PostalCode] TEXT,
+        [Country] TEXT,
+        [Phone] TEXT,
+        [Fax] TEXT,
+        [HomePage] TEXT
+    )
+
+    CREATE TABLE [Products]
+    (
+        [ProductID] INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        [ProductName] TEXT NOT NULL,
+        [SupplierID] INTEGER,
+        [CategoryID] INTEGER,
+        [QuantityPerUnit] TEXT,
+        [UnitPrice] NUMERIC DEFAULT 0,
+        [UnitsInStock] INTEGER DEFAULT 0,
+        [UnitsOnOrder] INTEGER DEFAULT 0,
+        [ReorderLevel] INTEGER DEFAULT 0,
+        [Discontinued] TEXT NOT NULL DEFAULT '0',
+        FOREIGN KEY ([CategoryID]) REFERENCES [Categories] ([CategoryID]),
+        FOREIGN KEY ([SupplierID]) REFERENCES [Suppliers] ([SupplierID])
+    )
+
+    CREATE TABLE [Orders]
+    (
+        [OrderID] INTEGER PRIMARY KEY AUTOINCREMENT,
+        [CustomerID] INTEGER,
+        [EmployeeID] INTEGER,
+        [OrderDate] DATETIME,
+        [ShipperID] INTEGER,
+        FOREIGN KEY (EmployeeID) REFERENCES Employees (EmployeeID),
+        FOREIGN KEY (CustomerID) REFERENCES Customers (CustomerID),
+        FOREIGN KEY (ShipperID) REFERENCES Shippers (ShipperID)
+    );
+
+    CREATE TABLE [Order Details]
+    (
+        [OrderID] INTEGER NOT NULL,
+        [ProductID] INTEGER NOT NULL,
+        [UnitPrice] NUMERIC NOT NULL DEFAULT 0,
+        [Quantity] INTEGER NOT NULL DEFAULT 1,
+        [Discount] REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY ("OrderID", "ProductID"),
+        FOREIGN KEY ([OrderID]) REFERENCES [Orders] ([OrderID]),
+        FOREIGN KEY ([ProductID]) REFERENCES [Products] ([ProductID]) 
+    )
+
+    Orders is indexed on CustomerID, EmployeeID, and OrderDate, and
+    Order Details is indexed on ProductID. Compare these columns directly
+    (for example, OrderDate >= '1997-01-01' AND OrderDate < '1998-01-01')
+    rather than wrapping them in functions such as strftime() so that
+    queries can use these indexes. OrderDate includes a time of day, so
+    use half-open ranges like this one for date ranges.
+
+    Generate a well-formed SQLite query from the user's prompt. Return
+    ONLY a JSON object of the form {"sql": "..."} containing the query.
+    Do not use SELECT *.
+    '''
+
+# System message sent with every text2sql request
+_SQL_SYSTEM_MESSAGE = Message(role='system', content=SQL_SYSTEM_PROMPT)
+
+# Have the model return a JSON object so the SQL can be extracted without
+# stripping markdown fences or other formatting
+SQL_RESPONSE_FORMAT = {'type': 'json_object'}
+
+# Helper function to convert natural-language queries into SQL queries.
+# Questions that differ only in whitespace share a cache entry, so repeated
+# questions are answered without calling the LLM.
+async def text2sql(text):
+    text = ' '.join(text.split())
+    sql = _sql_cache.get(text)
+
+    if sql is not None:
+        _sql_cache.move_to_end(text)
+        return sql
+
+    sql = await _generate_sql(text)
+    _sql_cache[text] = sql
+
+    if len(_sql_cache) > SQL_CACHE_SIZE:
+        _sql_cache.popitem(last=False) # Evict the least recently used entry
+
+    return sql
+
+async def _generate_sql(text):
+    # Check the semantic cache for a sufficiently similar question
+    if SEMANTIC_CACHE:
+        embedding = await _embed(text)
+
+        # The scan is CPU-bound, so run it on a worker thread rather than
+        # blocking the event loop
+        sql = await asyncio.to_thread(_semantic_lookup, embedding)
+
+        if sql is not None:
+            return sql
+
+    messages = [_SQL_SYSTEM_MESSAGE, Message(role='user', content=text)]
+    response = await _SQL_MODEL.aresponse(messages, response_format=SQL_RESPONSE_FORMAT)
+    sql = orjson.loads(response.content)['sql']
+
+    if SEMANTIC_CACHE:
+        _semantic_insert(embedding, sql)
+
+    return sql
+
+# Helper function to generate a unit-length embedding for a question
+async def _embed(text):
+    response = await _openai_client().embeddings.create(model=EMBEDDING_MODEL, input=text)
+    vector = response.data[0].embedding
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+# Helper function to find cached SQL for a question similar to the one embedded.
+# Entries added or evicted during the scan may be missed, which is harmless
+# for a cache.
+def _semantic_lookup(embedding):
+    best_sql, best_score = None, SIMILARITY_THRESHOLD
+
+    for cached_embedding, sql in _semantic_cache:
+        score = sum(map(operator.mul, embedding, cached_embedding))
+        if score >= best_score:
+            best_sql, best_score = sql, score
+
+    return best_sql
+
+# Helper function to add an entry to the semantic cache, evicting the oldest
+def _semantic_insert(embedding, sql):
+    _semantic_cache.append((embedding, sql))
+    if len(_semantic_cache) > SQL_CACHE_SIZE:
+        _semantic_cache.pop(0)
+
+@functools.lru_cache(maxsize=None)
+def _openai_client():
+    return AsyncOpenAI()
+
+# Helper function that wraps a sync tool function in an async one that runs
+# it on a worker thread. Because function_hook is async, agno calls sync tools
+# directly on the event loop, so tools that write files would block it.
+def run_in_thread(function):
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(function, *args, **kwargs)
+
+    return wrapper
 
 # Function to hook into function calls
-def function_hook(function_name, function_call, arguments):
-    print(f'\x1b[33mCalling {function_name}\x1b[0m')
-    return function_call(**arguments)
+async def function_hook(function_name, function_call, arguments):
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('%sCalling %s%s', _YELLOW, function_name, _RESET)
+    return await function_call(**arguments)
 
 # Function to create an agent
 def create_agent(session_id, memory):
@@ -171,6 +311,13 @@ def create_agent(session_id, memory):
     root_dir = os.path.dirname(os.path.abspath(__file__))
     output_path = os.path.join(root_dir, 'static')
 
+    # File generation tools that write files on a worker thread
+    file_generation_tools = FileGenerationTools(output_directory=output_path)
+    file_tools = Toolkit(
+        name=file_generation_tools.name,
+        tools=[run_in_thread(tool) for tool in file_generation_tools.tools]
+    )
+
     # Create an agent and connect it to a session
     agent = Agent(
         name='Northwind Agent',
@@ -178,7 +325,7 @@ def create_agent(session_id, memory):
         tools=[
             query_database,
             CalculatorTools(),
-            FileGenerationTools(output_directory=output_path)
+            file_tools
         ],
         tool_hooks=[function_hook], # Shows function calls performed by the agent
         instructions='''
@@ -219,7 +366,9 @@ def create_agent(session_id, memory):
             when appropriate.
             ''',
         add_history_to_context=True,
-        num_history_runs=10,
+        num_history_runs=HISTORY_RUNS,
+        enable_session_summaries=SESSION_SUMMARIES,
+        session_summary_manager=SessionSummaryManager(model=OpenAIChat(id=SUMMARY_MODEL)) if SESSION_SUMMARIES else None,
         session_id=session_id,
         db=memory,
         markdown=True
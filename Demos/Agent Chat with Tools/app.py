@@ -1,44 +1,85 @@
-import uuid
-from flask import Flask, render_template, request, Response, stream_with_context
+# To run this app, use the command "quart run" or "quart app --reload"
+# Since this is Quart, we no longer need stream_with_context
+
+import uuid, os, sys, logging
+from collections import OrderedDict
+from quart import Quart, render_template, request, Response
 from agno.db.in_memory import InMemoryDb
-from agents import create_agent
+from agents import create_agent, open_database, close_database
+
+# coalesce is shared by the demos and lives in the parent directory. It's
+# searched first so an installed package can't shadow it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo_streaming import coalesce
+
+# Show the tool calls made by the agents in the console. Set LOG_LEVEL
+# to INFO or higher to hide them.
+logging.basicConfig(format='%(message)s')
+logging.getLogger('agents').setLevel(os.getenv('LOG_LEVEL', 'DEBUG'))
 
-app = Flask(__name__)
+app = Quart(__name__)
 _memory = InMemoryDb() # Shared memory for agents
+_agents = OrderedDict() # Agents by session ID, least recently used first
+MAX_CACHED_AGENTS = 256
+
+# Helper function to get the agent for a session, creating it if necessary.
+# Agents are cached so returning users reuse the same agent.
+def get_agent(session_id):
+    agent = _agents.get(session_id)
+
+    if agent is None:
+        agent = create_agent(session_id, _memory)
+        _agents[session_id] = agent
+
+        if len(_agents) > MAX_CACHED_AGENTS:
+            _agents.popitem(last=False) # Evict the least recently used agent
+    else:
+        _agents.move_to_end(session_id)
+
+    return agent
 
 # Home page
 @app.route('/', methods=['GET'])
-def index():
-    return render_template('index.html')
-    
+async def index():
+    return await render_template('index.html')
+
 # REST method for chatting with an agent and generating a streaming response
 @app.route('/streaming_chat', methods=['GET'])
-def streaming_chat():
+async def streaming_chat():
     try:
         # Get the session ID or create a new one
         session_id = request.headers.get('X-Session-ID') or str(uuid.uuid4())
 
-        # Create an agent and connect it to a session
-        agent = create_agent(session_id, _memory)
+        # Get the agent for this session, creating it if necessary
+        agent = get_agent(session_id)
 
-        # Get the user input and generate a response
+        # Get the user input and generate a response. Independent tool
+        # calls requested by the model in the same turn run concurrently.
         user_input = request.args.get('input')
-        output = agent.run(user_input, stream=True)
+        output = agent.arun(user_input, stream=True)
 
         # Inline generator for streaming output
-        def generate(chunks):
-            for chunk in chunks:
+        async def generate():
+            async for chunk in output:
                 if chunk.event == 'RunContent':
                     yield chunk.content
 
-        response = Response(stream_with_context(generate(output)),
-                            mimetype='text/plain; charset=utf-8')
+        response = Response(coalesce(generate()), mimetype='text/plain; charset=utf-8')
         response.headers['X-Session-ID'] = session_id
         return response
 
     except Exception as e:
         output = f"I'm sorry, but something went wrong. ({str(e)})"
-        response = Response(stream_with_context(output),
-                            mimetype='text/plain; charset=utf-8')
+        response = Response(output, mimetype='text/plain; charset=utf-8')
         response.headers['X-Session-ID'] = session_id
         return response
+
+# Startup function to open the database connection
+@app.before_serving
+async def startup():
+    await open_database()
+
+# Shutdown function to close the database connection
+@app.after_serving
+async def shutdown():
+    await close_database()
@@ -0,0 +1,19 @@
+# One-time script that adds indexes to the Northwind database so the queries
+# generated by text2sql can use an index instead of scanning the Orders and
+# Order Details tables. The app opens the database read-only, so run this
+# script from this directory with "python create_indexes.py" whenever the
+# database is rebuilt. It's safe to run more than once.
+
+import sqlite3
+
+DB_PATH = 'static/northwind.db'
+
+connection = sqlite3.connect(DB_PATH)
+connection.executescript('''
+    CREATE INDEX IF NOT EXISTS idx_orders_customer ON Orders(CustomerID);
+    CREATE INDEX IF NOT EXISTS idx_orders_employee ON Orders(EmployeeID);
+    CREATE INDEX IF NOT EXISTS idx_orders_date ON Orders(OrderDate);
+    CREATE INDEX IF NOT EXISTS idx_order_details_product ON [Order Details](ProductID);
+    ANALYZE;
+''')
+connection.close()
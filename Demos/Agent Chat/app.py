@@ -1,54 +1,90 @@
-import uuid
-from flask import Flask, render_template, request, Response, stream_with_context
+# To run this app, use the command "quart run" or "quart app --reload"
+# Since this is Quart, we no longer need stream_with_context
+
+import uuid, os, sys
+from collections import OrderedDict
+from quart import Quart, render_template, request, Response
 from agno.models.openai import OpenAIChat
 from agno.db.in_memory import InMemoryDb
 from agno.agent import Agent
+from agno.session import SessionSummaryManager
+
+# coalesce is shared by the demos and lives in the parent directory. It's
+# searched first so an installed package can't shadow it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo_streaming import coalesce
 
-app = Flask(__name__)
+app = Quart(__name__)
 _memory = InMemoryDb() # Shared memory for agents
+_agents = OrderedDict() # Agents by session ID, least recently used first
+MAX_CACHED_AGENTS = 256
+HISTORY_RUNS = int(os.getenv('HISTORY_RUNS', '4')) # Recent runs sent with each prompt
 
-# Home page
-@app.route('/', methods=['GET'])
-def index():
-    return render_template('index.html')
-    
-# REST method for chatting with an agent and generating a streaming response
-@app.route('/streaming_chat', methods=['GET'])
-def streaming_chat():
-    try:
-        # Get the session ID or create a new one
-        session_id = request.headers.get('X-Session-ID') or str(uuid.uuid4())
+# Set SESSION_SUMMARIES to True to also summarize each session after every
+# run. Summaries cost an extra LLM call per run (made with SUMMARY_MODEL)
+# that the response stream waits for, so they're off by default.
+SESSION_SUMMARIES = os.getenv('SESSION_SUMMARIES', 'False').lower() == 'true'
+SUMMARY_MODEL = 'gpt-4o-mini'
 
-        # Create an agent and connect it to a session
+# Helper function to get the agent for a session, creating it if necessary.
+# Agents are cached so returning users reuse the same agent.
+def get_agent(session_id):
+    agent = _agents.get(session_id)
+
+    if agent is None:
         agent = Agent(
             name='Chat Agent',
             model=OpenAIChat(id='gpt-4o-mini'),
             instructions='You are a helpful AI assistant named LISA.',
             add_history_to_context=True,
-            num_history_runs=10,
+            num_history_runs=HISTORY_RUNS,
+            enable_session_summaries=SESSION_SUMMARIES,
+            session_summary_manager=SessionSummaryManager(model=OpenAIChat(id=SUMMARY_MODEL)) if SESSION_SUMMARIES else None,
             session_id=session_id,
             db=_memory,
             markdown=True
         )
 
+        _agents[session_id] = agent
+
+        if len(_agents) > MAX_CACHED_AGENTS:
+            _agents.popitem(last=False) # Evict the least recently used agent
+    else:
+        _agents.move_to_end(session_id)
+
+    return agent
+
+# Home page
+@app.route('/', methods=['GET'])
+async def index():
+    return await render_template('index.html')
+
+# REST method for chatting with an agent and generating a streaming response
+@app.route('/streaming_chat', methods=['GET'])
+async def streaming_chat():
+    try:
+        # Get the session ID or create a new one
+        session_id = request.headers.get('X-Session-ID') or str(uuid.uuid4())
+
+        # Get the agent for this session, creating it if necessary
+        agent = get_agent(session_id)
+
         # Get the user input and generate a response
         user_input = request.args.get('input')
-        output = agent.run(user_input, stream=True)
+        output = agent.arun(user_input, stream=True)
 
         # Inline generator for streaming output
-        def generate(chunks):
-            for chunk in chunks:
+        async def generate():
+            async for chunk in output:
                 if chunk.event == 'RunContent':
                     yield chunk.content
 
-        response = Response(stream_with_context(generate(output)),
-                            mimetype='text/plain; charset=utf-8')
+        response = Response(coalesce(generate()), mimetype='text/plain; charset=utf-8')
         response.headers['X-Session-ID'] = session_id
         return response
 
     except Exception as e:
         output = f"I'm sorry, but something went wrong. ({str(e)})"
-        response = Response(stream_with_context(output),
-                            mimetype='text/plain; charset=utf-8')
+        response = Response(output, mimetype='text/plain; charset=utf-8')
         response.headers['X-Session-ID'] = session_id
         return response
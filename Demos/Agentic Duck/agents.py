@@ -1,10 +1,133 @@
-import os, json
+import os, sys, orjson, threading, logging
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 from markitdown import MarkItDown
 from agno.team.team import Team
+from agno.session import SessionSummaryManager
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+# ANSI color codes for tool call logging. They're left out when the log
+# (stderr) isn't a terminal so pipes and log files don't get control codes.
+_COLOR = sys.stderr.isatty()
+_GREEN = '\x1b[32m' if _COLOR else ''
+_RESET = '\x1b[0m' if _COLOR else ''
 
 MODEL='gpt-4o'
+RETRIEVAL_MODEL='gpt-4o-mini' # Smaller, faster model for agents that only retrieve documents
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4) # Threads used to convert documents
+HISTORY_RUNS = int(os.getenv('HISTORY_RUNS', '4')) # Recent runs sent with each prompt
+
+# Set SESSION_SUMMARIES to True to also summarize each session after every
+# run. Summaries cost an extra LLM call per run (made with SUMMARY_MODEL)
+# that the response stream waits for, so they're off by default.
+SESSION_SUMMARIES = os.getenv('SESSION_SUMMARIES', 'False').lower() == 'true'
+SUMMARY_MODEL = 'gpt-4o-mini'
+
+CACHE_PATH = os.path.join('.cache', 'markdown.json') # Previously converted documents
+MAX_DOCUMENT_LENGTH = 8000 # Maximum characters of a single resume or job description
+
+_md = MarkItDown(enable_plugins=False) # Shared document-to-markdown converter
+
+# Helper function to load the cache of converted documents from disk
+def load_cache():
+    try:
+        with open(CACHE_PATH, 'rb') as cache_file:
+            return orjson.loads(cache_file.read())
+
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+# Helper function to write the cache of converted documents to disk
+def save_cache():
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    temp_path = f'{CACHE_PATH}.{threading.get_ident()}.tmp'
+
+    with open(temp_path, 'wb') as cache_file:
+        cache_file.write(orjson.dumps(_md_cache))
+
+    os.replace(temp_path, CACHE_PATH)
+
+# Markdown for each converted document keyed by path, modification time,
+# and size, so a document is only converted again if it changes
+_md_cache = load_cache()
+
+# Helper function to write the cache to disk if documents were converted
+# since it held cache_size entries
+def update_cache(cache_size):
+    if len(_md_cache) != cache_size:
+        try:
+            save_cache()
+        except OSError as e:
+            log.warning('Unable to save %s: %s', CACHE_PATH, e)
+
+# Helper function to convert a document, represented by an os.DirEntry, to
+# markdown. Uses the cached markdown if the document hasn't changed since it
+# was last converted.
+def convert_document(entry):
+    stat = entry.stat()
+    key = f'{entry.path}:{stat.st_mtime_ns}:{stat.st_size}'
+    text = _md_cache.get(key)
+
+    if text is None:
+        text = _md.convert(entry.path).text_content
+        _md_cache[key] = text
+
+    return text
+
+# Helper function to get os.DirEntry objects for the files in a directory
+def list_files(directory):
+    with os.scandir(directory) as entries:
+        return [entry for entry in entries if entry.is_file()]
+
+# Helper function to convert all the documents in a directory to markdown.
+# Documents are converted in parallel, and the function returns a list of
+# (file name, markdown) tuples for the documents that converted successfully.
+def convert_documents(directory):
+    def convert(entry):
+        try:
+            return entry.name, convert_document(entry)
+
+        except Exception as e:
+            log.warning('Unable to convert %s: %s', entry.path, e)
+            return None
+
+    cache_size = len(_md_cache)
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = executor.map(convert, list_files(directory))
+        documents = [result for result in results if result is not None]
+
+    update_cache(cache_size)
+    return documents
+
+# Helper function to list the names of the documents in a directory. The
+# name of a document is its file name without the extension.
+def list_documents(directory):
+    return sorted(os.path.splitext(entry.name)[0] for entry in list_files(directory))
+
+# Helper function to convert a single document in a directory to markdown.
+# Returns a (file name, markdown) tuple, or None if there is no document
+# with the specified name or it can't be converted. The markdown is limited
+# to MAX_DOCUMENT_LENGTH characters to bound the size of the prompts it
+# ends up in.
+def convert_named_document(directory, name):
+    for entry in list_files(directory):
+        if name in (entry.name, os.path.splitext(entry.name)[0]):
+            cache_size = len(_md_cache)
+
+            try:
+                text = convert_document(entry)
+
+            except Exception as e:
+                log.warning('Unable to convert %s: %s', entry.path, e)
+                return None
+
+            update_cache(cache_size)
+            return entry.name, text[:MAX_DOCUMENT_LENGTH]
+
+    return None
 
 # Tool function for retrieving job candidates
 def get_job_candidates():
@@ -18,24 +141,16 @@ def get_job_candidates():
         str: JSON string containing a list of job candidates and their resumes.
     '''
     
-    candidates = []
-    directory = 'candidates'
-    print('\x1b[32mRetrieving resumes\x1b[0m')
-    
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
+    log.debug('%sRetrieving resumes%s', _GREEN, _RESET)
 
-        try:
-            # Convert the document to markdown. Assumes the file name
-            # is the candidate's name.
-            md = MarkItDown(enable_plugins=False)
-            result = md.convert(file_path)
-            candidates.append({ 'Name': filename, 'Resume': result.text_content })
+    # Convert the documents to markdown. Assumes the file name
+    # is the candidate's name.
+    candidates = [
+        { 'Name': filename, 'Resume': text }
+        for filename, text in convert_documents('candidates')
+    ]
 
-        except Exception as e:
-            print(f'Unable to convert {file_path}: {e}')
-    
-    return json.dumps(candidates)
+    return orjson.dumps(candidates).decode()
 
 # Tool function for retrieving job descriptions
 def get_job_descriptions():
@@ -49,39 +164,116 @@ def get_job_descriptions():
         str: JSON string containing a list of companies and job openings at those companies.
     '''
 
-    jobs = []
-    directory = 'jobs'
-    print('\x1b[32mRetrieving job listings\x1b[0m')
-    
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
+    log.debug('%sRetrieving job listings%s', _GREEN, _RESET)
 
-        try:
-            # Convert the document to markdown. Assumes the file name
-            # is the company name.
-            md = MarkItDown(enable_plugins=False)
-            result = md.convert(file_path)
-            jobs.append({ 'Company': filename, 'Job Description': result.text_content })
+    # Convert the documents to markdown. Assumes the file name
+    # is the company name.
+    jobs = [
+        { 'Company': filename, 'Job Description': text }
+        for filename, text in convert_documents('jobs')
+    ]
 
-        except Exception as e:
-            print(f'Unable to convert {file_path}: {e}')
-   
-    return json.dumps(jobs)
+    return orjson.dumps(jobs).decode()
+
+# Tool function for listing job candidates
+def list_job_candidates():
+    '''
+    Lists the names of all job candidates.
+
+    Args:
+        None
+
+    Returns:
+        str: JSON string containing a list of candidate names.
+    '''
+
+    log.debug('%sListing candidates%s', _GREEN, _RESET)
+    return orjson.dumps(list_documents('candidates')).decode()
+
+# Tool function for retrieving a single job candidate
+def get_job_candidate(name):
+    '''
+    Retrieves the resume of a single job candidate.
+
+    Args:
+        name (str): Name of the candidate as returned by list_job_candidates.
+
+    Returns:
+        str: JSON string containing the candidate's name and resume.
+    '''
+
+    log.debug('%sRetrieving resume for %s%s', _GREEN, name, _RESET)
+    document = convert_named_document('candidates', name)
+
+    if document is None:
+        return orjson.dumps({ 'Error': f'No resume found for {name}' }).decode()
+
+    filename, text = document
+    return orjson.dumps({ 'Name': filename, 'Resume': text }).decode()
+
+# Tool function for listing job openings
+def list_job_descriptions():
+    '''
+    Lists the names of all companies with job openings.
+
+    Args:
+        None
+
+    Returns:
+        str: JSON string containing a list of company names.
+    '''
+
+    log.debug('%sListing job openings%s', _GREEN, _RESET)
+    return orjson.dumps(list_documents('jobs')).decode()
+
+# Tool function for retrieving a single job description
+def get_job_description(company):
+    '''
+    Retrieves the description of the job opening at a single company.
+
+    Args:
+        company (str): Name of the company as returned by list_job_descriptions.
+
+    Returns:
+        str: JSON string containing the company name and job description.
+    '''
+
+    log.debug('%sRetrieving job listing for %s%s', _GREEN, company, _RESET)
+    document = convert_named_document('jobs', company)
+
+    if document is None:
+        return orjson.dumps({ 'Error': f'No job description found for {company}' }).decode()
+
+    filename, text = document
+    return orjson.dumps({ 'Company': filename, 'Job Description': text }).decode()
 
 def create_team(session_id, memory):
     candidate_retrieval_agent = Agent(
         name='Candidate Retrieval Agent',
-        role='Retrieves the resumes of all candidates currently looking for a job.',
-        model=OpenAIChat(id=MODEL),
-        tools=[get_job_candidates],
+        role='Lists candidates currently looking for a job and retrieves their resumes.',
+        model=OpenAIChat(id=RETRIEVAL_MODEL),
+        tools=[list_job_candidates, get_job_candidate, get_job_candidates],
+        instructions='''
+            Use list_job_candidates to find out which candidates are available
+            and get_job_candidate to retrieve one candidate's resume. Only use
+            get_job_candidates when the resumes of all candidates are required.
+            ''',
+        add_history_to_context=False, # Stateless data retrieval needs no chat history
         markdown=True
     )
 
     job_retrieval_agent = Agent(
         name='Job Description Retrieval Agent',
-        role='Retrieves descriptions of all job openings that are currently on file.',
-        model=OpenAIChat(id=MODEL),
-        tools=[get_job_descriptions],
+        role='Lists job openings that are currently on file and retrieves their descriptions.',
+        model=OpenAIChat(id=RETRIEVAL_MODEL),
+        tools=[list_job_descriptions, get_job_description, get_job_descriptions],
+        instructions='''
+            Use list_job_descriptions to find out which companies have job
+            openings and get_job_description to retrieve the description of
+            one company's opening. Only use get_job_descriptions when the
+            descriptions of all job openings are required.
+            ''',
+        add_history_to_context=False, # Stateless data retrieval needs no chat history
         markdown=True
     )
 
@@ -107,11 +299,12 @@ def create_team(session_id, memory):
             about candidates. Use the Job Description Retrieval Agent to retrieve
             job openings and answer questions about them.
             
-            To evaluate a candidate's fitness for a job, consult the Candidate
-            Retrieval Agent for information about the candidate and the Job
-            Description Retrieval Agent for information about the job opening.
-            Then pass both to the Evaluation Agent. Include scores to support
-            your reasoning.
+            To evaluate a candidate's fitness for a job, ask the Candidate
+            Retrieval Agent for that candidate's resume only and the Job
+            Description Retrieval Agent for that job opening only. Then pass
+            both to the Evaluation Agent. When evaluating several candidates
+            or several jobs, evaluate one candidate and one job at a time.
+            Include scores to support your reasoning.
             
             Only evaluate candidates for whom resumes are available from the
             Candidate Retrieval Agent. Only evaluate candidates for jobs that
@@ -139,7 +332,9 @@ def create_team(session_id, memory):
             ''',
         model=OpenAIChat(id=MODEL),
         add_history_to_context=True,
-        num_history_runs=10,
+        num_history_runs=HISTORY_RUNS,
+        enable_session_summaries=SESSION_SUMMARIES,
+        session_summary_manager=SessionSummaryManager(model=OpenAIChat(id=SUMMARY_MODEL)) if SESSION_SUMMARIES else None,
         share_member_interactions=True,
         session_id=session_id,
         db=memory,
@@ -1,44 +1,74 @@
-import uuid, json
-from flask import Flask, render_template, request, Response, stream_with_context
+# To run this app, use the command "quart run" or "quart app --reload"
+# Since this is Quart, we no longer need stream_with_context
+
+import uuid, os, sys, logging
+from collections import OrderedDict
+from quart import Quart, render_template, request, Response
 from agno.db.in_memory import InMemoryDb
 from agents import create_team
 
-app = Flask(__name__)
+# coalesce is shared by the demos and lives in the parent directory. It's
+# searched first so an installed package can't shadow it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo_streaming import coalesce
+
+# Show the tool calls made by the agents in the console. Set LOG_LEVEL
+# to INFO or higher to hide them.
+logging.basicConfig(format='%(message)s')
+logging.getLogger('agents').setLevel(os.getenv('LOG_LEVEL', 'DEBUG'))
+
+app = Quart(__name__)
 _memory = InMemoryDb() # Shared memory for agents
+_teams = OrderedDict() # Teams by session ID, least recently used first
+MAX_CACHED_TEAMS = 256
+
+# Helper function to get the team for a session, creating it if necessary.
+# Teams are cached so returning users reuse the same team.
+def get_team(session_id):
+    team = _teams.get(session_id)
+
+    if team is None:
+        team = create_team(session_id, _memory)
+        _teams[session_id] = team
+
+        if len(_teams) > MAX_CACHED_TEAMS:
+            _teams.popitem(last=False) # Evict the least recently used team
+    else:
+        _teams.move_to_end(session_id)
+
+    return team
 
 # Home page
 @app.route('/', methods=['GET'])
-def index():
-    return render_template('index.html')
+async def index():
+    return await render_template('index.html')
 
 # REST method for invoking a team of agents
 @app.route('/team', methods=['GET'])
-def ask_team():
+async def ask_team():
     try:
         # Get the session ID or create a new one
         session_id = request.headers.get('X-Session-ID') or str(uuid.uuid4())
 
-        # Create a team and connect it to a session
-        team = create_team(session_id, _memory)
+        # Get the team for this session, creating it if necessary
+        team = get_team(session_id)
 
         # Get the user input and generate a response
         user_input = request.args.get('input')
-        output = team.run(user_input, stream=True)
+        output = team.arun(user_input, stream=True)
 
         # Inline generator for streaming output
-        def generate(chunks):
-            for chunk in chunks:
+        async def generate():
+            async for chunk in output:
                 if chunk.event == 'TeamRunContent':
                     yield chunk.content
 
-        response = Response(stream_with_context(generate(output)),
-                            mimetype='text/plain; charset=utf-8')
+        response = Response(coalesce(generate()), mimetype='text/plain; charset=utf-8')
         response.headers['X-Session-ID'] = session_id
         return response
 
     except Exception as e:
         output = f"I'm sorry, but something went wrong. ({str(e)})"
-        response = Response(stream_with_context(output),
-                            mimetype='text/plain; charset=utf-8')
+        response = Response(output, mimetype='text/plain; charset=utf-8')
         response.headers['X-Session-ID'] = session_id
         return response
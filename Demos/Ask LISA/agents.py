@@ -1,17 +1,59 @@
 # Built and tested against Agno 2.0.7 and OpenAI 1.109.1. If something
 # doesn't work, try installing these versions.
 
-import tempfile
-import json, sqlite3, re
+import tempfile, os, sys, logging
+import orjson, sqlite3, math, operator, functools, threading
+from openai import OpenAI
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 from agno.tools.python import PythonTools
 from agno.models.message import Message
 from agno.team.team import Team
+from agno.session import SessionSummaryManager
 from pathlib import Path
 
+log = logging.getLogger(__name__)
+
+# ANSI color codes for tool call logging. They're left out when the log
+# (stderr) isn't a terminal so pipes and log files don't get control codes.
+_COLOR = sys.stderr.isatty()
+_GREEN = '\x1b[32m' if _COLOR else ''
+_YELLOW = '\x1b[33m' if _COLOR else ''
+_RESET = '\x1b[0m' if _COLOR else ''
+
 MODEL='gpt-4.1'
+SQL_MODEL='gpt-4o-mini' # Smaller, faster model for converting questions to SQL
 TOOL_PATH = Path(tempfile.gettempdir()) # For .py files created by the Python tool
+HISTORY_RUNS = int(os.getenv('HISTORY_RUNS', '4')) # Recent runs sent with each prompt
+
+# Set SESSION_SUMMARIES to True to also summarize each session after every
+# run. Summaries cost an extra LLM call per run (made with SUMMARY_MODEL)
+# that the response stream waits for, so they're off by default.
+SESSION_SUMMARIES = os.getenv('SESSION_SUMMARIES', 'False').lower() == 'true'
+SUMMARY_MODEL = 'gpt-4o-mini'
+
+# Caching of generated SQL. Set SEMANTIC_CACHE to True to also reuse SQL
+# for questions that are similar, but not identical, to earlier ones.
+SQL_CACHE_SIZE = 512
+SEMANTIC_CACHE = False
+EMBEDDING_MODEL = 'text-embedding-3-small'
+SIMILARITY_THRESHOLD = 0.95
+_semantic_cache = [] # (embedding, sql) pairs for the semantic cache
+
+# Model used by text2sql, created once and shared by all calls
+_SQL_MODEL = OpenAIChat(id=SQL_MODEL, temperature=0.2)
+
+# Connection to the database, opened once and shared by all queries. The
+# lock serializes access from the web server's worker threads.
+DB_PATH = 'static/nasdaq.db'
+_DB = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+_DB.executescript('''
+    PRAGMA cache_size=-65536;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA query_only=1;
+''')
+_DB_LOCK = threading.Lock()
 
 # Tool function for querying the database
 def query_database(text):
@@ -26,49 +68,111 @@ def query_database(text):
     '''
 
     sql = text2sql(text)
-    print(f'\x1b[32m{sql}\x1b[0m')
-    connection = sqlite3.connect('static/nasdaq.db')
-    cursor = connection.cursor()
-    cursor.execute(sql)
-    rows = cursor.fetchall()
-    return json.dumps(rows)
-
-# Helper function to convert natural-language queries into SQL queries
+    log.debug('%s%s%s', _GREEN, sql, _RESET)
+    # Encode rows one at a time as they're read rather than fetching them all
+    with _DB_LOCK:
+        cursor = _DB.execute(sql)
+        return '[' + ','.join(orjson.dumps(row).decode() for row in cursor) + ']'
+
+# System prompt used to convert natural-language queries into SQL queries.
+# It holds everything except the user's question, which is sent in a
+# separate user message, so every request starts with the same text. That
+# lets OpenAI's prompt caching skip reprocessing it (cache hits are reported
+# as cache_read_tokens in the response metrics). Keep it free of anything
+# that varies from call to call.
+SQL_SYSTEM_PROMPT = '''
+    The database targeted by the query contains the following table:
+
+    CREATE TABLE Stocks (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Symbol TEXT NOT NULL,   -- Stock symbol (for example, "MSFT")
+        Date DATE NOT NULL,     -- Date
+        Open NUMERIC NOT NULL,  -- Opening price of the stock on that date
+        Low NUMERIC NOT NULL,   -- Lowest price of the stock on that date
+        High NUMERIC NOT NULL,  -- Highest price of the stock on that date
+        Close NUMERIC NOT NULL, -- Closing price of the stock on that date
+        Volume INT NOT NULL     -- Number of shares traded on that date
+    )
+
+    The Stocks table is indexed on (Symbol, Date) and on Date. Compare
+    Symbol and Date directly (for example, Symbol = 'MSFT' AND Date
+    BETWEEN '2023-01-01' AND '2023-12-31') rather than wrapping them in
+    functions such as strftime() so that queries can use these indexes.
+
+    Generate a well-formed SQLite query from the user's prompt. Return
+    ONLY a JSON object of the form {"sql": "..."} containing the query.
+    Do not use SELECT *.
+    '''
+
+# System message sent with every text2sql request
+_SQL_SYSTEM_MESSAGE = Message(role='system', content=SQL_SYSTEM_PROMPT)
+
+# Have the model return a JSON object so the SQL can be extracted without
+# stripping markdown fences or other formatting
+SQL_RESPONSE_FORMAT = {'type': 'json_object'}
+
+# Helper function to convert natural-language queries into SQL queries.
+# Questions that differ only in whitespace share a cache entry, so repeated
+# questions are answered without calling the LLM.
 def text2sql(text):
-    prompt = f'''
-        Generate a well-formed SQLite query from the prompt below. Return
-        the SQL only. Do not use markdown formatting, and do not use SELECT *.
-
-        PROMPT: {text}
-	
-        The database targeted by the query contains the following table:
-
-        CREATE TABLE Stocks (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            Symbol TEXT NOT NULL,   -- Stock symbol (for example, "MSFT")
-            Date DATE NOT NULL,     -- Date
-            Open NUMERIC NOT NULL,  -- Opening price of the stock on that date
-            Low NUMERIC NOT NULL,   -- Lowest price of the stock on that date
-            High NUMERIC NOT NULL,  -- Highest price of the stock on that date
-            Close NUMERIC NOT NULL, -- Closing price of the stock on that date
-            Volume INT NOT NULL     -- Number of shares traded on that date
-        )
-        '''
-
-    model=OpenAIChat(id=MODEL, temperature=0.2)
-    messages = [Message(role='user', content=prompt)]
-    response = model.response(messages)
-    pattern = r'^```[\w]*\n|\n```$'
-    content = re.sub(pattern, '', response.content, flags=re.MULTILINE)
-    return content
+    return _cached_text2sql(' '.join(text.split()))
+
+@functools.lru_cache(maxsize=SQL_CACHE_SIZE)
+def _cached_text2sql(text):
+    # Check the semantic cache for a sufficiently similar question
+    if SEMANTIC_CACHE:
+        embedding = _embed(text)
+        sql = _semantic_lookup(embedding)
+
+        if sql is not None:
+            return sql
+
+    messages = [_SQL_SYSTEM_MESSAGE, Message(role='user', content=text)]
+    response = _SQL_MODEL.response(messages, response_format=SQL_RESPONSE_FORMAT)
+    sql = orjson.loads(response.content)['sql']
+
+    if SEMANTIC_CACHE:
+        _semantic_insert(embedding, sql)
+
+    return sql
+
+# Helper function to generate a unit-length embedding for a question
+def _embed(text):
+    response = _openai_client().embeddings.create(model=EMBEDDING_MODEL, input=text)
+    vector = response.data[0].embedding
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+# Helper function to find cached SQL for a question similar to the one embedded.
+# Entries added or evicted during the scan may be missed, which is harmless
+# for a cache.
+def _semantic_lookup(embedding):
+    best_sql, best_score = None, SIMILARITY_THRESHOLD
+
+    for cached_embedding, sql in _semantic_cache:
+        score = sum(map(operator.mul, embedding, cached_embedding))
+        if score >= best_score:
+            best_sql, best_score = sql, score
+
+    return best_sql
+
+# Helper function to add an entry to the semantic cache, evicting the oldest
+def _semantic_insert(embedding, sql):
+    _semantic_cache.append((embedding, sql))
+    if len(_semantic_cache) > SQL_CACHE_SIZE:
+        _semantic_cache.pop(0)
+
+@functools.lru_cache(maxsize=None)
+def _openai_client():
+    return OpenAI()
 
 # Function to hook into function calls and show member delegations
-def delegation_hook(function_name, function_call, arguments):
+async def delegation_hook(function_name, function_call, arguments):
     if function_name == 'delegate_task_to_member':
-        member_id = arguments.get('member_id')
-        print(f'\x1b[33mDelegating to {member_id}\x1b[0m')
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('%sDelegating to %s%s', _YELLOW, arguments.get('member_id'), _RESET)
 
-    return function_call(**arguments)
+    return await function_call(**arguments)
 
 # Function to create a team of agents
 def create_team(session_id, memory, file_name):
@@ -85,6 +189,7 @@ def create_team(session_id, memory, file_name):
             ''',
         model=OpenAIChat(id=MODEL, temperature=0.2),
         tools=[query_database],
+        add_history_to_context=False, # Stateless data retrieval needs no chat history
         markdown=True
     )
 
@@ -167,7 +272,9 @@ def create_team(session_id, memory, file_name):
         model=OpenAIChat(id=MODEL),
         share_member_interactions=True,
         add_history_to_context=True,
-        num_history_runs=12,
+        num_history_runs=HISTORY_RUNS,
+        enable_session_summaries=SESSION_SUMMARIES,
+        session_summary_manager=SessionSummaryManager(model=OpenAIChat(id=SUMMARY_MODEL)) if SESSION_SUMMARIES else None,
         session_id=session_id,
         db=memory,
         markdown=True
@@ -1,19 +1,78 @@
-import uuid, base64, os
-from flask import Flask, render_template, request, Response, stream_with_context
+# To run this app, use the command "quart run" or "quart app --reload"
+# Since this is Quart, we no longer need stream_with_context
+
+import uuid, os, sys, re, logging, asyncio
+from quart import Quart, render_template, request, Response, send_file
+from quart.wrappers.response import FileBody
 from agno.db.in_memory import InMemoryDb
 from agents import create_team
 
-app = Flask(__name__)
+# coalesce is shared by the demos and lives in the parent directory. It's
+# searched first so an installed package can't shadow it.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from demo_streaming import coalesce
+
+# Show the tool calls made by the agents in the console. Set LOG_LEVEL
+# to INFO or higher to hide them.
+logging.basicConfig(format='%(message)s')
+logging.getLogger('agents').setLevel(os.getenv('LOG_LEVEL', 'DEBUG'))
+
+app = Quart(__name__)
 _memory = InMemoryDb() # Shared memory for agents
+_STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static') # Where charts are saved
+
+# Chart file names generated by script.js (a random UUID plus .png). Only
+# files with these names are written by the team or served and deleted by
+# get_image, so the app's own static files can't be touched.
+_CHART_NAME = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.png')
+
+# Response body for a file that is deleted once it has been sent. Used for
+# generated charts, which are only downloaded once. The file is deleted on a
+# worker thread so the unlink doesn't block the event loop.
+class TemporaryFileBody(FileBody):
+    async def __aexit__(self, exc_type, exc_value, tb):
+        await super().__aexit__(exc_type, exc_value, tb)
+        await asyncio.to_thread(os.remove, self.file_path) # Clean up by deleting the image
+
+# Helper function to parse a Range header of the form bytes=start-end,
+# bytes=start- or bytes=-length for a file of the specified size. Returns a
+# (start, end) tuple where end is exclusive, or None if there is no header or
+# it isn't a single valid byte range. start >= end means the range can't be
+# satisfied.
+def parse_range(range_header, size):
+    if not range_header:
+        return None
+
+    units, _, spec = range_header.partition('=')
+
+    if units.strip() != 'bytes' or ',' in spec:
+        return None
+
+    first, _, last = spec.strip().partition('-')
+
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+
+            if last and end <= start:
+                return None
+
+            return start, min(end, size)
+
+        return max(size - int(last), 0), size
+
+    except ValueError:
+        return None
 
 # Home page
 @app.route('/', methods=['GET'])
-def index():
-    return render_template('index.html')
+async def index():
+    return await render_template('index.html')
 
 # REST method for invoking a team of agents
 @app.route('/streaming_chat', methods=['GET'])
-def streaming_chat():
+async def streaming_chat():
     try:
         # Get the session ID or create a new one
         session_id = request.headers.get('X-Session-ID') or str(uuid.uuid4())
@@ -21,57 +80,84 @@ def streaming_chat():
         # Get the user input and the file name to use for
         # generated images, if any
         user_input = request.args.get('input')
-        file_name = request.args.get('file_name')
+        file_name = request.args.get('file_name', '')
+
+        if not _CHART_NAME.fullmatch(file_name):
+            raise ValueError(f'Invalid file name: {file_name}')
 
         # Create a team, connect it to a session, and start a run
         team = create_team(session_id, _memory, file_name)
-        output = team.run(user_input, stream=True)
+        output = team.arun(user_input, stream=True)
 
         # Inline generator for streaming output
-        def generate(chunks):
-            for chunk in chunks:
+        async def generate():
+            async for chunk in output:
                 if chunk.event == 'TeamRunContent':
                     yield chunk.content
 
         # Stream the response
-        response = Response(
-            stream_with_context(generate(output)),
-            mimetype='text/plain; charset=utf-8'
-        )
-
+        response = Response(coalesce(generate()), mimetype='text/plain; charset=utf-8')
         response.headers['X-Session-ID'] = session_id
         return response
-    
+
     except Exception as e:
         # Stream back an error message
         output = f"I'm sorry, but something went wrong. ({str(e)})"
-
-        response = Response(
-            stream_with_context(output),
-            mimetype='text/plain; charset=utf-8'
-        )
-
+        response = Response(output, mimetype='text/plain; charset=utf-8')
         response.headers['X-Session-ID'] = session_id
         return response
 
 # REST method for downloading generated images
 @app.route('/get_image', methods=['GET'])
-def get_image():
+async def get_image():
+    file_name = request.args.get('file_name', '')
+
+    # Only serve (and delete) generated charts
+    if not _CHART_NAME.fullmatch(file_name):
+        return '', 400
+
+    image_path = os.path.join(_STATIC_DIR, file_name)
+
+    # Most requests are for charts that weren't generated, so check for the
+    # image up front rather than handling an exception
+    if not os.path.isfile(image_path):
+        return '', 404 # Image file doesn't exist
+
     try:
-        file_name = request.args.get('file_name')
-        root_dir = os.path.dirname(os.path.abspath(__file__))
-        image_path = os.path.join(root_dir, 'static', file_name)
-
-        if os.path.exists(image_path):
-            with open(image_path, 'rb') as image_file:
-                image_bytes = image_file.read()
-
-            base64_image = base64.b64encode(image_bytes).decode('utf-8')
-            src = f'data:image/png;base64,{base64_image}'
-            os.remove(image_path) # Clean up by deleting the image
-            return Response(src, mimetype='text/plain; charset=utf-8')
-        else:
-            return '' # Image file doesn't exist
-        
-    except Exception as e:
-        return ''
\ No newline at end of file
+        size = os.path.getsize(image_path)
+        byte_range = parse_range(request.headers.get('Range'), size)
+
+        if byte_range is None:
+            # Send the PNG as is rather than as a base64 data URI. Quart
+            # streams it from disk, and it's deleted once it has been sent.
+            # HEAD requests send no body, so they leave the image in place.
+            response = await send_file(image_path, mimetype='image/png')
+
+            if request.method == 'GET':
+                response.response = TemporaryFileBody(image_path)
+
+            response.headers['Accept-Ranges'] = 'bytes'
+            return response
+
+        # Send only the requested part of the PNG so clients can render
+        # a prefix first. The image is deleted once its last byte has
+        # been sent.
+        start, end = byte_range
+
+        if start >= end:
+            return '', 416, { 'Content-Range': f'bytes */{size}' }
+
+        with open(image_path, 'rb') as image_file:
+            image_file.seek(start)
+            image_bytes = image_file.read(end - start)
+
+        # The requested bytes are already in memory, so delete the image in
+        # the background while the response is sent
+        if end == size and request.method == 'GET':
+            app.add_background_task(os.remove, image_path)
+
+        headers = { 'Accept-Ranges': 'bytes', 'Content-Range': f'bytes {start}-{end - 1}/{size}' }
+        return Response(image_bytes, status=206, mimetype='image/png', headers=headers)
+
+    except OSError:
+        return '', 404 # Image was deleted or became unreadable after the check
@@ -0,0 +1,19 @@
+# One-time script that adds indexes to the NASDAQ database so the queries
+# generated by text2sql can use an index instead of scanning the Stocks
+# table. The app opens the database read-only, so run this script from
+# this directory with "python create_indexes.py" whenever the database is
+# rebuilt. It's safe to run more than once.
+
+import sqlite3
+
+DB_PATH = 'static/nasdaq.db'
+
+connection = sqlite3.connect(DB_PATH)
+connection.executescript('''
+    CREATE INDEX IF NOT EXISTS idx_stocks_symbol_date ON Stocks(Symbol, Date);
+    CREATE INDEX IF NOT EXISTS idx_stocks_date ON Stocks(Date);
+    DROP INDEX IF EXISTS idx_symbol; -- Superseded by idx_stocks_symbol_date
+    ANALYZE;
+    VACUUM;
+''')
+connection.close()
@@ -65,19 +65,19 @@ const streamChatResponse = async (incomingChatDiv) => {
             chatContainer.scrollIntoView({ behavior: "smooth", block: "end" });
         }
 
-        // If a chart was generated, fetch it and display it
-        url = `/get_image?file_name=${fileName}`;
-        response = await fetch(url, { headers: { "X-Session-ID": sessionID }});
-        src = await response.text();
-
-        if (src.length > 0) {
-            let imgElement = document.createElement("img");
-            imgElement.src = src;
-            imgElement.setAttribute("class", "chart");
-            imgElement.setAttribute("alt", "ai-generated chart")
+        // If a chart was generated, display it. The image is only added to
+        // the chat once it loads because /get_image returns a 404 if there
+        // is no chart.
+        let imgElement = document.createElement("img");
+        imgElement.setAttribute("class", "chart");
+        imgElement.setAttribute("alt", "ai-generated chart");
+
+        imgElement.onload = () => {
             divElement.parentNode.parentNode.appendChild(imgElement);
             chatContainer.scrollIntoView({ behavior: "smooth", block: "end" });
-        }
+        };
+
+        imgElement.src = `/get_image?file_name=${fileName}`;
     }
     catch (error) {
         console.error(error);
@@ -19,6 +19,7 @@ from config import config
 from services.mcp_service import mcp_service
 from services.agent_service import AgentService
 from routes.chat_routes import create_chat_routes
+from utils.api_usage_tracker import api_usage_tracker
 from utils.error_handler import ConfigurationError
 
 # Configure logging
@@ -40,7 +41,7 @@ def create_app() -> Quart:
     is_valid, errors = config.validate()
     if not is_valid:
         for error in errors:
-            logger.error(f"Configuration error: {error}")
+            logger.error("Configuration error: %s", error)
         raise ConfigurationError("Invalid configuration. Check logs for details.")
 
     # Create Quart application
@@ -65,14 +66,17 @@ def create_app() -> Quart:
     async def startup():
         """Initialize MCP connections before serving requests."""
         logger.info("Starting Stock Market Chat application...")
-        logger.info(f"Using model: {config.AGENT_MODEL}")
-        logger.info(f"Agent history runs: {config.AGENT_HISTORY_RUNS}")
+        logger.info("Using model: %s", config.AGENT_MODEL)
+        logger.info("Agent history runs: %s", config.AGENT_HISTORY_RUNS)
+
+        # Save API usage data in the background, off the request path
+        await api_usage_tracker.start()
 
         try:
             await mcp_service.connect_all()
             logger.info("✓ Application startup complete")
         except Exception as e:
-            logger.error(f"Failed to start application: {str(e)}")
+            logger.error("Failed to start application: %s", e)
             raise
 
     # Shutdown event - Clean up MCP connections
@@ -81,6 +85,7 @@ def create_app() -> Quart:
         """Clean up resources when shutting down."""
         logger.info("Shutting down Stock Market Chat application...")
         await mcp_service.disconnect_all()
+        await api_usage_tracker.stop()
         logger.info("✓ Application shutdown complete")
 
     return app
@@ -96,7 +101,7 @@ if __name__ == '__main__':
 
     For production, use: hypercorn app:app
     """
-    logger.info(f"Starting development server on {config.HOST}:{config.PORT}")
+    logger.info("Starting development server on %s:%s", config.HOST, config.PORT)
     app.run(
         host=config.HOST,
         port=config.PORT,
@@ -38,38 +38,44 @@ class Config:
     # Logging settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
-    @classmethod
-    def validate(cls) -> tuple[bool, list[str]]:
+    def __init__(self):
         """
-        Validate required configuration.
+        Precompute values derived from the settings, which don't change
+        after startup.
+        """
+        self.alpha_vantage_url: Optional[str] = (
+            self.ALPHA_VANTAGE_MCP_URL_TEMPLATE.format(api_key=self.ALPHA_VANTAGE_API_KEY)
+            if self.ALPHA_VANTAGE_API_KEY else None
+        )
+        self._validation: Optional[tuple[bool, list[str]]] = None
+
+    def validate(self) -> tuple[bool, list[str]]:
+        """
+        Validate required configuration. The result is computed once and
+        cached.
 
         Returns:
             Tuple of (is_valid, list_of_errors)
         """
+        if self._validation is not None:
+            return self._validation
+
         errors = []
 
-        if not cls.ALPHA_VANTAGE_API_KEY:
+        if not self.ALPHA_VANTAGE_API_KEY:
             errors.append(
                 "ALPHA_VANTAGE_API_KEY not set. "
                 "Get a free API key at https://www.alphavantage.co/support/#api-key"
             )
 
-        if not cls.OPENAI_API_KEY:
+        if not self.OPENAI_API_KEY:
             errors.append(
                 "OPENAI_API_KEY not set. "
                 "Get your API key at https://platform.openai.com/api-keys"
             )
 
-        return len(errors) == 0, errors
-
-    @classmethod
-    def get_alpha_vantage_url(cls) -> Optional[str]:
-        """Get the Alpha Vantage MCP URL with API key."""
-        if not cls.ALPHA_VANTAGE_API_KEY:
-            return None
-        return cls.ALPHA_VANTAGE_MCP_URL_TEMPLATE.format(
-            api_key=cls.ALPHA_VANTAGE_API_KEY
-        )
+        self._validation = (len(errors) == 0, errors)
+        return self._validation
 
 
 # Create a singleton instance
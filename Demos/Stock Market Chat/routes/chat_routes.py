@@ -3,8 +3,8 @@ Chat routes for the Stock Market Chat application.
 Handles all chat-related HTTP endpoints.
 """
 
-import uuid
 import logging
+import secrets
 from quart import request, Response, Blueprint
 from services.mcp_service import mcp_service
 from services.agent_service import AgentService
@@ -45,7 +45,7 @@ def create_chat_routes(agent_service: AgentService) -> Blueprint:
 
         try:
             # Get or create session ID
-            session_id = request.headers.get('X-Session-ID') or str(uuid.uuid4())
+            session_id = request.headers.get('X-Session-ID') or secrets.token_hex(16)
 
             # Get and validate user input
             user_input = request.args.get('input')
@@ -53,7 +53,8 @@ def create_chat_routes(agent_service: AgentService) -> Blueprint:
             if not is_valid:
                 raise ValidationError(validation_error)
 
-            logger.info(f"Session {session_id[:8]}: Processing query: {user_input[:50]}...")
+            # %.8s and %.50s truncate the values only if the message is logged
+            logger.info("Session %.8s: Processing query: %.50s...", session_id, user_input)
 
             # Ensure MCP connection is active
             await mcp_service.ensure_connected()
@@ -84,7 +85,7 @@ def create_chat_routes(agent_service: AgentService) -> Blueprint:
             return response
 
         except ValidationError as e:
-            logger.warning(f"Validation error: {str(e)}")
+            logger.warning("Validation error: %s", e)
             output = f"Invalid input: {str(e)}"
             response = Response(output, mimetype='text/plain; charset=utf-8', status=400)
             if session_id:
@@ -4,7 +4,9 @@ Encapsulates agent configuration and creation logic.
 """
 
 import logging
-from typing import List
+import sys
+import textwrap
+from typing import Sequence
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 from agno.db.in_memory import InMemoryDb
@@ -17,8 +19,9 @@ logger = logging.getLogger(__name__)
 class AgentService:
     """Service for creating and managing stock market analyst agents."""
 
-    # Agent system instructions
-    SYSTEM_INSTRUCTIONS = '''
+    # Agent system instructions, dedented once so the indentation isn't sent
+    # to the model with every prompt
+    SYSTEM_INSTRUCTIONS = sys.intern(textwrap.dedent('''
         You are an expert stock market analyst with access to real-time and historical
         stock market data through Alpha Vantage. Your role is to help users understand
         stock market trends, company performance, and make informed decisions.
@@ -48,7 +51,7 @@ class AgentService:
 
         Use the Alpha Vantage tools to access stock market data and provide
         accurate, timely information to help users make informed decisions.
-    '''
+    ''').strip())
 
     def __init__(self, memory_db: InMemoryDb):
         """
@@ -62,19 +65,19 @@ class AgentService:
     def create_agent(
         self,
         session_id: str,
-        mcp_tools_list: List[MCPTools]
+        mcp_tools_list: Sequence[MCPTools]
     ) -> Agent:
         """
         Create a stock market analyst agent.
 
         Args:
             session_id: Unique session identifier
-            mcp_tools_list: List of MCPTools instances for data access
+            mcp_tools_list: MCPTools instances for data access
 
         Returns:
             Configured Agent instance
         """
-        logger.info(f"Creating agent for session {session_id}")
+        logger.info("Creating agent for session %s", session_id)
 
         agent = Agent(
             name='Stock Market Analyst',
@@ -84,7 +87,7 @@ class AgentService:
                 id=config.AGENT_MODEL,
                 temperature=config.AGENT_TEMPERATURE
             ),
-            tools=mcp_tools_list if mcp_tools_list else [],
+            tools=mcp_tools_list,
             session_id=session_id,
             db=self.memory_db,
             add_history_to_context=True,
@@ -93,8 +96,8 @@ class AgentService:
         )
 
         logger.info(
-            f"Agent created with {len(mcp_tools_list)} tool(s), "
-            f"history: {config.AGENT_HISTORY_RUNS} runs"
+            "Agent created with %d tool(s), history: %d runs",
+            len(mcp_tools_list), config.AGENT_HISTORY_RUNS
         )
 
         return agent
@@ -5,7 +5,7 @@ Handles connection lifecycle, retries, and multiple MCP server support.
 
 import asyncio
 import logging
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from agno.tools.mcp import MCPTools
 from tenacity import (
     retry,
@@ -25,18 +25,18 @@ class MCPService:
 
     def __init__(self):
         """Initialize the MCP service."""
-        self._mcp_tools_list: List[MCPTools] = []
+        self._mcp_tools: Tuple[MCPTools, ...] = ()
         self._connection_lock = asyncio.Lock()
 
     @property
-    def tools(self) -> List[MCPTools]:
-        """Get the list of connected MCP tools."""
-        return self._mcp_tools_list
+    def tools(self) -> Tuple[MCPTools, ...]:
+        """Get the connected MCP tools as an immutable tuple."""
+        return self._mcp_tools
 
     @property
     def is_connected(self) -> bool:
         """Check if any MCP connections are active."""
-        return len(self._mcp_tools_list) > 0
+        return len(self._mcp_tools) > 0
 
     async def connect_all(self) -> None:
         """
@@ -46,8 +46,8 @@ class MCPService:
             Exception: If no MCP servers could be connected.
         """
         async with self._connection_lock:
-            self._mcp_tools_list = await self._open_connections()
-            logger.info(f"✓ Connected to {len(self._mcp_tools_list)} MCP server(s)")
+            self._mcp_tools = tuple(await self._open_connections())
+            logger.info("✓ Connected to %d MCP server(s)", len(self._mcp_tools))
 
     async def ensure_connected(self) -> None:
         """Ensure MCP connections are active, reconnect if needed."""
@@ -58,13 +58,13 @@ class MCPService:
     async def disconnect_all(self) -> None:
         """Disconnect from all MCP servers."""
         async with self._connection_lock:
-            for mcp_tools in self._mcp_tools_list:
+            for mcp_tools in self._mcp_tools:
                 try:
                     await mcp_tools.close()
                 except Exception as e:
-                    logger.error(f"Error closing MCP connection: {str(e)}")
+                    logger.error("Error closing MCP connection: %s", e)
 
-            self._mcp_tools_list = []
+            self._mcp_tools = ()
             logger.info("✓ Disconnected from all MCP servers")
 
     async def _open_connections(self) -> List[MCPTools]:
@@ -103,7 +103,7 @@ class MCPService:
         Returns:
             MCPTools instance if successful, None otherwise.
         """
-        mcp_url = config.get_alpha_vantage_url()
+        mcp_url = config.alpha_vantage_url
         if not mcp_url:
             logger.error("Alpha Vantage API key not configured")
             return None
@@ -133,8 +133,8 @@ class MCPService:
             return await _attempt_connection()
         except Exception as e:
             logger.error(
-                f"Failed to connect to Alpha Vantage after "
-                f"{config.MCP_CONNECTION_RETRIES} attempts: {str(e)}"
+                "Failed to connect to Alpha Vantage after %d attempts: %s",
+                config.MCP_CONNECTION_RETRIES, e
             )
             return None
 
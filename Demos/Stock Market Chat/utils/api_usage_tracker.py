@@ -3,14 +3,27 @@ API Usage Tracker for monitoring Alpha Vantage API calls.
 Helps track daily usage against the 25 requests/day free tier limit.
 """
 
-import json
+import asyncio
+import atexit
+import contextlib
 import logging
+import os
+import threading
+import time
 from datetime import datetime, date
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Number of recorded calls between writes of the usage file
+_SAVE_EVERY = 10
+
+# Maximum seconds between writes when saving in the background
+_FLUSH_INTERVAL = 5.0
+
 
 class APIUsageTracker:
     """Tracks API usage to monitor against rate limits."""
@@ -25,27 +38,94 @@ class APIUsageTracker:
         self.storage_path = Path(storage_path)
         self._usage_data = self._load_usage()
 
+        # Usage is stored as separate maps keyed by date ordinal, so the
+        # hot path only touches small flat dicts
+        self._counts: Dict[int, int] = self._usage_data["counts"]
+        self._endpoints_by_day: Dict[int, Dict[str, int]] = self._usage_data["endpoints_by_day"]
+        self._timestamps_by_day: Dict[int, List[float]] = self._usage_data["timestamps_by_day"]
+        self._unsaved_calls = 0
+
+        # Usage data is saved on a worker thread while the event loop keeps
+        # recording calls. _data_lock guards the data and the unsaved call
+        # count, and is never held during disk I/O. _save_lock keeps two
+        # saves from writing the file at the same time.
+        self._data_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._save_requested: Optional[asyncio.Event] = None
+        atexit.register(self.flush)
+
     def _load_usage(self) -> Dict:
-        """Load usage data from storage."""
+        """Load usage data from storage, converting files in the older per-day layout."""
+        usage = {"counts": {}, "endpoints_by_day": {}, "timestamps_by_day": {}}
         if self.storage_path.exists():
             try:
-                with open(self.storage_path, 'r') as f:
-                    return json.load(f)
+                data = orjson.loads(self.storage_path.read_bytes())
+                if "counts" in data:
+                    for name, by_day in usage.items():
+                        by_day.update((int(day), value) for day, value in data[name].items())
+                else:
+                    # Older files hold one entry per ISO date
+                    for day, entry in data.items():
+                        ordinal = date.fromisoformat(day).toordinal()
+                        usage["counts"][ordinal] = entry["count"]
+                        usage["endpoints_by_day"][ordinal] = entry["endpoints"]
+                        usage["timestamps_by_day"][ordinal] = [entry["first_call"], entry["last_call"]]
             except Exception as e:
-                logger.warning(f"Could not load usage data: {e}")
-        return {}
+                logger.warning("Could not load usage data: %s", e)
+                usage = {"counts": {}, "endpoints_by_day": {}, "timestamps_by_day": {}}
+        return usage
 
     def _save_usage(self) -> None:
-        """Save usage data to storage."""
-        try:
-            with open(self.storage_path, 'w') as f:
-                json.dump(self._usage_data, f, indent=2)
-        except Exception as e:
-            logger.error(f"Could not save usage data: {e}")
-
-    def _get_today_key(self) -> str:
-        """Get the storage key for today's date."""
-        return date.today().isoformat()
+        """Save usage data to storage, replacing the file atomically."""
+        temp_path = self.storage_path.with_suffix('.tmp')
+        with self._save_lock:
+            try:
+                # Serialize the data and count the calls it includes together,
+                # so calls recorded while the file is written stay unsaved
+                with self._data_lock:
+                    saved_calls = self._unsaved_calls
+                    data = orjson.dumps(
+                        self._usage_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+                    )
+                temp_path.write_bytes(data)
+                os.replace(temp_path, self.storage_path)
+                with self._data_lock:
+                    self._unsaved_calls -= saved_calls
+            except Exception as e:
+                logger.error("Could not save usage data: %s", e)
+
+    def flush(self) -> None:
+        """Save usage data if calls were recorded since the last save."""
+        if self._unsaved_calls:
+            self._save_usage()
+
+    async def start(self) -> None:
+        """Start saving usage data in a background task instead of on the caller's thread."""
+        self._save_requested = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flusher())
+
+    async def stop(self) -> None:
+        """Stop the background task and save any unsaved calls."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        await asyncio.to_thread(self.flush)
+
+    async def _flusher(self) -> None:
+        """Save usage data on a worker thread when requested or every few seconds."""
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._save_requested.wait(), _FLUSH_INTERVAL)
+            self._save_requested.clear()
+            if self._unsaved_calls:
+                await asyncio.to_thread(self._save_usage)
+
+    def _get_today_key(self) -> int:
+        """Get the storage key (date ordinal) for today's date."""
+        return date.today().toordinal()
 
     def record_api_call(self, endpoint: str = "unknown") -> None:
         """
@@ -55,33 +135,36 @@ class APIUsageTracker:
             endpoint: Name of the API endpoint called
         """
         today = self._get_today_key()
+        now = time.time()  # Formatted only when a summary is generated
 
-        if today not in self._usage_data:
-            self._usage_data[today] = {
-                "count": 0,
-                "endpoints": {},
-                "first_call": datetime.now().isoformat(),
-                "last_call": None
-            }
+        with self._data_lock:
+            count = self._counts.get(today, 0) + 1
+            self._counts[today] = count
 
-        self._usage_data[today]["count"] += 1
-        self._usage_data[today]["last_call"] = datetime.now().isoformat()
+            # Track per-endpoint usage and the times of the first and last calls
+            endpoints = self._endpoints_by_day.setdefault(today, {})
+            endpoints[endpoint] = endpoints.get(endpoint, 0) + 1
+            self._timestamps_by_day.setdefault(today, [now, now])[1] = now
 
-        # Track per-endpoint usage
-        if endpoint not in self._usage_data[today]["endpoints"]:
-            self._usage_data[today]["endpoints"][endpoint] = 0
-        self._usage_data[today]["endpoints"][endpoint] += 1
+            self._unsaved_calls += 1
+            unsaved_calls = self._unsaved_calls
 
-        self._save_usage()
+        # Save every few calls rather than on every call. Remaining calls
+        # are saved at exit. If the background task is running, it does the
+        # saving so the caller never waits on disk I/O.
+        if unsaved_calls >= _SAVE_EVERY:
+            if self._flush_task:
+                self._save_requested.set()
+            else:
+                self._save_usage()
 
         # Log warning if approaching limit
-        count = self._usage_data[today]["count"]
         if count >= 25:
-            logger.error(f"⚠️ Daily API limit REACHED: {count}/25 calls today!")
+            logger.error("⚠️ Daily API limit REACHED: %d/25 calls today!", count)
         elif count >= 20:
-            logger.warning(f"⚠️ Approaching daily API limit: {count}/25 calls today")
+            logger.warning("⚠️ Approaching daily API limit: %d/25 calls today", count)
         elif count >= 15:
-            logger.info(f"ℹ️ API usage: {count}/25 calls today")
+            logger.info("ℹ️ API usage: %d/25 calls today", count)
 
     def get_today_usage(self) -> Dict:
         """
@@ -91,10 +174,11 @@ class APIUsageTracker:
             Dictionary with usage stats
         """
         today = self._get_today_key()
+        today_str = date.fromordinal(today).isoformat()
 
-        if today not in self._usage_data:
+        if today not in self._counts:
             return {
-                "date": today,
+                "date": today_str,
                 "count": 0,
                 "limit": 25,
                 "remaining": 25,
@@ -102,16 +186,17 @@ class APIUsageTracker:
                 "endpoints": {}
             }
 
-        count = self._usage_data[today]["count"]
+        count = self._counts[today]
+        first_call, last_call = self._timestamps_by_day.get(today, (None, None))
         return {
-            "date": today,
+            "date": today_str,
             "count": count,
             "limit": 25,
             "remaining": max(0, 25 - count),
             "percentage": (count / 25) * 100,
-            "endpoints": self._usage_data[today]["endpoints"],
-            "first_call": self._usage_data[today].get("first_call"),
-            "last_call": self._usage_data[today].get("last_call")
+            "endpoints": self._endpoints_by_day.get(today, {}),
+            "first_call": first_call,
+            "last_call": last_call
         }
 
     def can_make_request(self) -> bool:
@@ -124,6 +209,13 @@ class APIUsageTracker:
         usage = self.get_today_usage()
         return usage["remaining"] > 0
 
+    @staticmethod
+    def _format_timestamp(timestamp: Union[float, str]) -> str:
+        """Format a call timestamp, which older usage files store as ISO strings."""
+        if isinstance(timestamp, str):
+            return timestamp
+        return datetime.fromtimestamp(timestamp).isoformat()
+
     def get_usage_summary(self) -> str:
         """
         Get a formatted usage summary.
@@ -145,10 +237,10 @@ Endpoint Breakdown:
         for endpoint, count in usage.get("endpoints", {}).items():
             summary += f"  • {endpoint}: {count} calls\n"
 
-        if usage['first_call']:
-            summary += f"\nFirst call: {usage['first_call']}"
-        if usage['last_call']:
-            summary += f"\nLast call:  {usage['last_call']}"
+        if usage.get('first_call'):
+            summary += f"\nFirst call: {self._format_timestamp(usage['first_call'])}"
+        if usage.get('last_call'):
+            summary += f"\nLast call:  {self._format_timestamp(usage['last_call'])}"
 
         return summary
 
@@ -4,10 +4,64 @@ Provides consistent error messages and handling across the application.
 """
 
 import logging
+import re
 from typing import Tuple
 
 logger = logging.getLogger(__name__)
 
+# Substrings of error messages (case-insensitive) that identify each kind of
+# error, in the order of precedence used when several kinds match
+_ERROR_PATTERNS = (
+    ("context_length", ("context_length_exceeded", "maximum context length")),
+    ("connectivity", ("network", "connection")),
+    ("rate_limit", ("rate limit",)),
+    ("forbidden", ("403", "forbidden")),
+    ("unauthorized", ("401", "unauthorized")),
+    ("timeout", ("timeout",)),
+)
+
+# User-friendly message for each kind of error
+_ERROR_MESSAGES = {
+    "context_length": (
+        "The conversation history has exceeded the maximum token limit. "
+        "Please refresh the page to start a new conversation."
+    ),
+    "connectivity": (
+        "I'm experiencing connectivity issues with the data provider. "
+        "This might be due to rate limits (free tier allows 5 calls/minute, 25/day). "
+        "Please wait a moment and try again."
+    ),
+    "rate_limit": (
+        "API rate limit reached. Free Alpha Vantage tier allows 5 requests per minute "
+        "and 25 per day. Please wait a few minutes before trying again."
+    ),
+    "forbidden": (
+        "Access denied by the API. Please verify your Alpha Vantage API key is valid."
+    ),
+    "unauthorized": (
+        "Authentication failed. Please check your API keys in the .env file."
+    ),
+    "timeout": (
+        "Request timed out. The API might be experiencing high load. "
+        "Please try again in a moment."
+    ),
+}
+
+
+# Precedence of each kind of error
+_PRECEDENCE = {kind: precedence for precedence, (kind, _) in enumerate(_ERROR_PATTERNS)}
+
+# Single case-insensitive alternation of all the patterns, with one named
+# group per kind of error. re.ASCII limits case folding to ASCII letters,
+# matching the lowercase comparison the patterns were written for.
+_ERROR_CLASSIFIER = re.compile(
+    "|".join(
+        f"(?P<{kind}>{'|'.join(re.escape(pattern) for pattern in patterns)})"
+        for kind, patterns in _ERROR_PATTERNS
+    ),
+    re.IGNORECASE | re.ASCII
+)
+
 
 class ErrorHandler:
     """Centralized error handling for the application."""
@@ -23,52 +77,22 @@ class ErrorHandler:
         Returns:
             User-friendly error message
         """
-        error_str = str(error).lower()
-
-        # Context length exceeded
-        if "context_length_exceeded" in error_str or "maximum context length" in error_str:
-            return (
-                "The conversation history has exceeded the maximum token limit. "
-                "Please refresh the page to start a new conversation."
-            )
-
-        # Network/connectivity issues
-        if "network" in error_str or "connection" in error_str:
-            return (
-                "I'm experiencing connectivity issues with the data provider. "
-                "This might be due to rate limits (free tier allows 5 calls/minute, 25/day). "
-                "Please wait a moment and try again."
-            )
-
-        # Rate limiting
-        if "rate limit" in error_str:
-            return (
-                "API rate limit reached. Free Alpha Vantage tier allows 5 requests per minute "
-                "and 25 per day. Please wait a few minutes before trying again."
-            )
-
-        # Authentication/forbidden
-        if "403" in error_str or "forbidden" in error_str:
-            return (
-                "Access denied by the API. Please verify your Alpha Vantage API key is valid."
-            )
-
-        # Unauthorized
-        if "401" in error_str or "unauthorized" in error_str:
-            return (
-                "Authentication failed. Please check your API keys in the .env file."
-            )
+        error_str = str(error)
 
-        # Timeout
-        if "timeout" in error_str:
-            return (
-                "Request timed out. The API might be experiencing high load. "
-                "Please try again in a moment."
-            )
+        # Classify the error in a single pass over the message without
+        # making a lowercase copy. If several kinds of error match, the one
+        # with the highest precedence wins.
+        kind = min(
+            (m.lastgroup for m in _ERROR_CLASSIFIER.finditer(error_str)),
+            key=_PRECEDENCE.get,
+            default=None
+        )
+        if kind:
+            return _ERROR_MESSAGES[kind]
 
         # Default error message
         return (
-            f"I'm sorry, but something went wrong: {str(error)}\n\n"
+            f"I'm sorry, but something went wrong: {error_str}\n\n"
             "Please try rephrasing your question or wait a moment before trying again."
         )
 
@@ -82,9 +106,9 @@ class ErrorHandler:
             context: Additional context about where the error occurred
         """
         if context:
-            logger.error(f"Error in {context}: {str(error)}", exc_info=True)
+            logger.error("Error in %s: %s", context, error, exc_info=True)
         else:
-            logger.error(f"Error: {str(error)}", exc_info=True)
+            logger.error("Error: %s", error, exc_info=True)
 
     @staticmethod
     def handle_streaming_error(error: Exception) -> str:
@@ -98,7 +122,7 @@ class ErrorHandler:
             Error message formatted for streaming output
         """
         error_str = str(error)
-        logger.error(f"Error during streaming: {error_str}")
+        logger.error("Error during streaming: %s", error_str)
 
         # Check for specific error types
         if "context_length_exceeded" in error_str or "maximum context length" in error_str:
@@ -134,12 +158,13 @@ def validate_input(user_input: str) -> Tuple[bool, str]:
     if not user_input:
         return False, "No input provided"
 
-    if len(user_input.strip()) == 0:
-        return False, "Input cannot be empty"
-
     if len(user_input) > 10000:
         return False, "Input is too long (maximum 10,000 characters)"
 
+    # isspace() checks for whitespace-only input without copying it like strip()
+    if user_input.isspace():
+        return False, "Input cannot be empty"
+
     return True, ""
 
 
@@ -0,0 +1,58 @@
+# Streaming helpers shared by the demo apps
+
+import asyncio
+
+# Helper function that combines small chunks of streaming output into larger
+# ones to reduce the number of writes. The first chunk is passed through
+# immediately so the user sees output as soon as possible, and buffered text
+# is never held for more than max_delay seconds, even if the model pauses
+# (for example, to call a tool).
+async def coalesce(chunks, min_size=64, max_delay=0.02):
+    loop = asyncio.get_running_loop()
+    iterator = chunks.__aiter__()
+    buffer, size, first = [], 0, True
+    pending, deadline = None, None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            # Wait for the next chunk, but only until the deadline if text is
+            # buffered. The deadline is max_delay after the oldest buffered text.
+            timeout = max(0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({ pending }, timeout=timeout)
+
+            if not done:
+                yield ''.join(buffer)
+                buffer.clear()
+                size = 0
+                continue
+
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if not chunk:
+                continue
+
+            if not buffer:
+                deadline = loop.time() + max_delay
+
+            buffer.append(chunk)
+            size += len(chunk)
+
+            if first or size >= min_size:
+                yield ''.join(buffer)
+                buffer.clear()
+                size, first = 0, False
+
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+    if buffer:
+        yield ''.join(buffer)